@@ -25,6 +25,8 @@ from .parser import (
     SSHConfigParser,
 )
 
+import os
+
 import typer
 
 __version__ = "0.1.0"
@@ -44,16 +46,32 @@ def convert(
 ):
     """Convert SSH config between different formats."""
     try:
-        # Auto-detect format if not specified
-        source_format = from_format or detect_format(input_file)
-        target_format = to_format or detect_format(output_file)
+        with open(input_file, 'r', encoding='utf-8') as f:
+            content = f.read()
+        
+        # Source format is auto-detected if not specified; the target defaults
+        # to the output file's extension
+        target_format = to_format or _format_from_path(output_file)
         
-        result = convert_format(input_file, output_file, source_format, target_format)
-        typer.echo(f"Successfully converted {source_format} to {target_format}: {result}")
+        # The CLI opts into the on-disk parse cache for repeated runs
+        result = convert_format(content, target_format, from_format, use_cache=True)
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write(result)
+        typer.echo(f"Successfully converted {input_file} to {target_format}: {output_file}")
     except Exception as e:
         typer.secho(f"Error: {str(e)}", fg=typer.colors.RED, err=True)
         raise typer.Exit(1)
 
+
+def _format_from_path(path: str) -> str:
+    """Guess a format from a file extension, defaulting to SSH config."""
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix in ('.yaml', '.yml'):
+        return 'yaml'
+    if suffix == '.json':
+        return 'json'
+    return 'ssh'
+
 @app.command()
 def version():
     """Show the version of ssh-config tool."""
@@ -25,7 +25,7 @@ import typer
 # Add the src directory to the path so we can import our modules
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from ssh_config.core import convert_ssh_config
+from ssh_config.core import SSHConfigConverter, convert_ssh_config
 
 
 app = typer.Typer(
@@ -34,6 +34,29 @@ app = typer.Typer(
     add_completion=False,
 )
 
+# Parent directories already created (or found) by _ensure_parent_dir
+_mkdir_cache: set[Path] = set()
+
+
+def _ensure_parent_dir(dest_path: Path) -> None:
+    """Create the parent directory of dest_path once per process."""
+    parent = dest_path.parent
+    if parent not in _mkdir_cache:
+        parent.mkdir(parents=True, exist_ok=True)
+        _mkdir_cache.add(parent)
+
+
+def _write_stdout(content: str) -> None:
+    """Write converted content to stdout as UTF-8 bytes, bypassing the text layer."""
+    buffer = getattr(sys.stdout, "buffer", None)
+    if buffer is None:
+        # stdout was replaced by a text-only stream
+        typer.echo(content, nl=False)
+        return
+    sys.stdout.flush()
+    buffer.write(content.encode("utf-8"))
+    buffer.flush()
+
 
 @app.command()
 def main(
@@ -78,7 +101,7 @@ def main(
                 result = convert_ssh_config(content, to_json=True)
             elif to_ssh:
                 result = convert_ssh_config(content, to_ssh=True)
-            typer.echo(result, nl=False)
+            _write_stdout(result)
         except Exception as e:
             typer.echo(f"Error: {e}", err=True)
             raise typer.Exit(code=1)
@@ -95,14 +118,8 @@ def main(
         
         try:
             if src_path.is_file():
-                with open(src_path, 'r') as f:
-                    content = f.read()
-                if to_yaml:
-                    result = convert_ssh_config(content, to_yaml=True)
-                elif to_json:
-                    result = convert_ssh_config(content, to_json=True)
-                elif to_ssh:
-                    result = convert_ssh_config(content, to_ssh=True)
+                # Memory-maps the file; SSH configs are scanned without decoding it all
+                result = SSHConfigConverter().convert_file(src_path, target_format)
             elif src_path.is_dir():
                 # For now, we'll just process the directory as a simple case
                 # In a full implementation, you'd want to scan for SSH config files
@@ -115,14 +132,14 @@ def main(
             if dest:
                 # Write to file
                 dest_path = Path(dest)
-                dest_path.parent.mkdir(parents=True, exist_ok=True)
-                with open(dest_path, 'w') as f:
-                    f.write(result)
+                _ensure_parent_dir(dest_path)
+                with open(dest_path, 'wb') as f:
+                    f.write(result.encode('utf-8'))
                 typer.echo(f"File has been saved successfully")
                 typer.echo(f"File path: {dest_path}")
             else:
                 # Output to stdout
-                typer.echo(result, nl=False)
+                _write_stdout(result)
                 
         except Exception as e:
             typer.echo(f"Error: {e}", err=True)
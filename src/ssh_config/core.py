@@ -12,65 +12,307 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import io
+import mmap
 import os
 import json
-import yaml
+import re
+import sys
 from pathlib import Path
-from typing import Union, Dict, List, Any, Optional
+from typing import Union, Dict, Iterable, List, Any, Optional, Tuple
+
+# yaml导入开销较大，只在第一次真正处理YAML时由 _import_yaml() 加载
+_yaml = None
+_Loader = None
+_Dumper = None
+
+
+def _import_yaml():
+    """导入yaml模块（只导入一次），并优先选择libyaml实现的Loader/Dumper"""
+    global _yaml, _Loader, _Dumper
+    if _yaml is None:
+        import yaml
+        try:
+            from yaml import CSafeLoader as _Loader, CSafeDumper as _Dumper
+        except ImportError:  # 未编译libyaml时回退到纯Python实现
+            from yaml import SafeLoader as _Loader, SafeDumper as _Dumper
+        _yaml = yaml
+    return _yaml
+
+
+def _yaml_load(content: str) -> Any:
+    """用SafeLoader（优先libyaml实现）解析YAML"""
+    yaml = _import_yaml()
+    return yaml.load(content, Loader=_Loader)
+
+
+def _yaml_dump(data: Any, **kwargs: Any) -> str:
+    """用SafeDumper（优先libyaml实现）输出YAML"""
+    yaml = _import_yaml()
+    return yaml.dump(data, Dumper=_Dumper, **kwargs)
+
+
+def _stdlib_json_dumps(data: Any) -> str:
+    return json.dumps(data, indent=2, ensure_ascii=False)
+
+
+try:
+    import orjson
+except ImportError:  # 未安装orjson时使用标准库json
+    orjson = None
+
+# orjson只支持64位整数：解析时会把更大的整数变成浮点数，序列化时直接报错
+_BIG_INT_RE = re.compile(r'-?\d{19,}')
+
+
+def _json_loads(content: str) -> Any:
+    """解析JSON，安装了orjson时优先使用；可能含有超过64位的整数时交给标准库"""
+    if orjson is None or _BIG_INT_RE.search(content):
+        return json.loads(content)
+    try:
+        return orjson.loads(content)
+    except orjson.JSONDecodeError:
+        # NaN、Infinity等标准库接受的写法，由标准库解析或给出同样的错误
+        return json.loads(content)
+
+
+def _orjson_compatible(data: Any) -> bool:
+    """检查orjson的输出是否与标准库完全一致
+    
+    只允许字符串键的字典、列表、字符串、布尔值、None和64位以内的整数；
+    浮点数的写法不同（如1e+16与1e16，inf被写成null），日期等类型标准库会报错，
+    这些都交给标准库处理。同一个容器出现两次（YAML锚点、循环引用）时也交给标准库
+    """
+    seen = set()
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        kind = type(value)
+        if kind is dict or kind is list or kind is tuple:
+            if id(value) in seen:
+                return False
+            seen.add(id(value))
+            if kind is dict:
+                if not all(type(key) is str for key in value):
+                    return False
+                stack.extend(value.values())
+            else:
+                stack.extend(value)
+        elif kind is int:
+            if not -2 ** 63 <= value < 2 ** 64:
+                return False
+        elif kind is not str and kind is not bool and value is not None:
+            return False
+    return True
+
+
+def _json_dumps(data: Any) -> str:
+    """输出缩进2格、不转义非ASCII字符的JSON，无论是否安装orjson结果一致"""
+    if orjson is None or not _orjson_compatible(data):
+        return _stdlib_json_dumps(data)
+    return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode("utf-8")
+
 
 # 定义主机配置的类型
 HostConfig = Dict[str, Union[str, List[str]]]
 
+# 匹配一行 "关键字 值"，直接得到去除首尾空白后的关键字和值；字节版本用于mmap
+# 与OpenSSH一样只把ASCII空白当作分隔符，字符串和字节版本对不间断空格、全角空格等的处理才一致
+_LINE_RE = re.compile(r'^[ \t]*([^\s#]\S*)[ \t]+(\S.*?)[ \t\r]*$', re.MULTILINE | re.ASCII)
+_LINE_RE_BYTES = re.compile(_LINE_RE.pattern.encode("ascii"), re.MULTILINE | re.ASCII)
+
+# convert_file() 和 parser.process_directory() 检测格式时只读取文件开头这么多字节
+_SNIFF_SIZE = 4096
+
+# ssh_config(5) 中的全部关键字（规范大小写），用于把解析出的键还原成标准写法
+_SSH_KEYWORDS = (
+    'Host', 'Match', 'AddKeysToAgent', 'AddressFamily', 'BatchMode',
+    'BindAddress', 'BindInterface', 'CanonicalDomains',
+    'CanonicalizeFallbackLocal', 'CanonicalizeHostname', 'CanonicalizeMaxDots',
+    'CanonicalizePermittedCNAMEs', 'CASignatureAlgorithms', 'CertificateFile',
+    'ChannelTimeout', 'CheckHostIP', 'Ciphers', 'ClearAllForwardings',
+    'Compression', 'ConnectionAttempts', 'ConnectTimeout', 'ControlMaster',
+    'ControlPath', 'ControlPersist', 'DynamicForward',
+    'EnableEscapeCommandline', 'EnableSSHKeysign', 'EscapeChar',
+    'ExitOnForwardFailure', 'FingerprintHash', 'ForkAfterAuthentication',
+    'ForwardAgent', 'ForwardX11', 'ForwardX11Timeout', 'ForwardX11Trusted',
+    'GatewayPorts', 'GlobalKnownHostsFile', 'GSSAPIAuthentication',
+    'GSSAPIDelegateCredentials', 'HashKnownHosts',
+    'HostbasedAcceptedAlgorithms', 'HostbasedAuthentication',
+    'HostKeyAlgorithms', 'HostKeyAlias', 'HostName', 'IdentitiesOnly',
+    'IdentityAgent', 'IdentityFile', 'IgnoreUnknown', 'Include', 'IPQoS',
+    'KbdInteractiveAuthentication', 'KbdInteractiveDevices', 'KexAlgorithms',
+    'KnownHostsCommand', 'LocalCommand', 'LocalForward', 'LogLevel',
+    'LogVerbose', 'MACs', 'NoHostAuthenticationForLocalhost',
+    'NumberOfPasswordPrompts', 'ObscureKeystrokeTiming',
+    'PasswordAuthentication', 'PermitLocalCommand', 'PermitRemoteOpen',
+    'PKCS11Provider', 'Port', 'PreferredAuthentications', 'ProxyCommand',
+    'ProxyJump', 'ProxyUseFdpass', 'PubkeyAcceptedAlgorithms',
+    'PubkeyAcceptedKeyTypes', 'PubkeyAuthentication', 'RekeyLimit',
+    'RemoteCommand', 'RemoteForward', 'RequestTTY', 'RequiredRSASize',
+    'RevokedHostKeys', 'SecurityKeyProvider', 'SendEnv', 'ServerAliveCountMax',
+    'ServerAliveInterval', 'SessionType', 'SetEnv', 'StdinNull',
+    'StreamLocalBindMask', 'StreamLocalBindUnlink', 'StrictHostKeyChecking',
+    'SyslogFacility', 'TCPKeepAlive', 'Tag', 'Tunnel', 'TunnelDevice',
+    'UpdateHostKeys', 'UseKeychain', 'User', 'UserKnownHostsFile',
+    'VerifyHostKeyDNS', 'VisualHostKey', 'XAuthLocation',
+)
+# 键名字符串驻留后，各主机字典共用同一个对象，查找时可以直接按身份比较
+_CANONICAL = {keyword.lower(): sys.intern(keyword) for keyword in _SSH_KEYWORDS}
+
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """生成匹配 ``words`` 中任一单词的前缀压缩正则
+    
+    公共前缀只写一次（``host``、``hostname`` -> ``host(?:name)?``），
+    正则引擎不必为每个候选词重复扫描相同的前缀
+    """
+    trie: Dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for char in word.lower():
+            node = node.setdefault(char, {})
+        node[''] = {}  # 单词结束
+    return _trie_node_pattern(trie)
+
+
+def _trie_node_pattern(node: Dict[str, Any]) -> str:
+    """把一个前缀树节点（连同子节点）写成正则片段"""
+    branches = [re.escape(char) + _trie_node_pattern(child)
+                for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ''
+    if len(branches) > 1:
+        pattern = '(?:' + '|'.join(branches) + ')'
+    elif '' in node and len(branches[0]) > 1:
+        pattern = '(?:' + branches[0] + ')'
+    else:
+        pattern = branches[0]
+    # 有单词在此结束时，后面的部分可有可无
+    return pattern + '?' if '' in node else pattern
+
+
+# 格式探测用的特征行：顶格的ssh_config(5)关键字后跟空格、制表符或 "="，
+# YAML的文档标记、列表项或 "key:" 映射。SSH关键字必须顶格，
+# 否则YAML块标量里缩进的 "include ..." 之类的文本也会被当成SSH
+_SSH_HINT_RE = re.compile(r'^' + _trie_pattern(_SSH_KEYWORDS) + r'[ \t=]', re.IGNORECASE | re.MULTILINE)
+_YAML_HINT_RE = re.compile(r'^(?:%|---|-(?:[ \t]|$)|[A-Za-z_][\w-]*:(?:[ \t]|$))', re.MULTILINE)
+
+# 可以出现多次、需要保存为列表的选项
+_MULTI_VALUE = frozenset({
+    'identityfile', 'localforward', 'remoteforward', 'certificatefile', 'dynamicforward',
+    'globalknownhostsfile', 'userknownhostsfile', 'sendenv', 'setenv',
+})
+
+# 可以不加引号输出的YAML纯量：以字母、_、/、~ 开头（排除数字、时间戳等会被解析成其他类型的写法），
+# 单词间只有单个空格，不含 "#"、双引号等特殊字符；": " 和结尾的 ":" 另行排除，
+# YAML 1.1 中的布尔值和null需要加引号
+_YAML_PLAIN_RE = re.compile(r"[A-Za-z_/~][\w./~@%+=,()*':-]*(?: [\w./~@%+=,()*':-]+)*", re.ASCII)
+_YAML_RESERVED = frozenset({
+    'yes', 'Yes', 'YES', 'no', 'No', 'NO',
+    'true', 'True', 'TRUE', 'false', 'False', 'FALSE',
+    'on', 'On', 'ON', 'off', 'Off', 'OFF', 'null', 'Null', 'NULL', '~',
+})
+
+
+def _yaml_scalar(value: Any) -> Optional[str]:
+    """把字符串或整数写成YAML纯量，需要时加单引号；无法安全输出时返回None"""
+    if type(value) is int:
+        return str(value)
+    if not isinstance(value, str) or not value.isascii() or not value.isprintable():
+        return None
+    if (_YAML_PLAIN_RE.fullmatch(value) and value not in _YAML_RESERVED
+            and ': ' not in value and not value.endswith(':')):
+        return value
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _sniff_format(content: str) -> str:
+    """只根据首字符和特征行猜测去除首尾空白后内容的格式，不做完整解析
+    
+    同时出现SSH和YAML特征行时也先猜YAML，确认解析失败再回退到SSH
+    """
+    if content[:1] in ("{", "["):
+        return "json"
+    if _YAML_HINT_RE.search(content):
+        return "yaml"
+    return "ssh"
+
+
+def _sure_format(content: str) -> Optional[str]:
+    """只出现SSH或只出现YAML特征行时返回该格式，否则返回None（需要完整解析才能确定）"""
+    if content[:1] in ("{", "["):
+        return None
+    is_ssh = _SSH_HINT_RE.search(content) is not None
+    if is_ssh == (_YAML_HINT_RE.search(content) is not None):
+        return None
+    return "ssh" if is_ssh else "yaml"
+
+
 class SSHConfigConverter:
     """SSH配置文件转换器，支持SSH Config、YAML、JSON三种格式之间的相互转换"""
     
     @staticmethod
     def detect_format(content: str) -> str:
         """自动检测输入内容的格式"""
+        return SSHConfigConverter._detect_and_parse(content)[0]
+    
+    @staticmethod
+    def _detect_and_parse(content: str) -> Tuple[str, Any]:
+        """检测格式，同时返回检测过程中已解析出的JSON/YAML对象（SSH格式时为None）"""
         content = content.strip()
         if not content:
             raise ValueError("Empty content")
+        
+        # 先快速猜测格式，只对候选格式做一次完整解析确认
+        candidate = _sniff_format(content)
             
         # 尝试JSON
-        try:
-            json.loads(content)
-            return "json"
-        except json.JSONDecodeError:
-            pass
+        if candidate == "json":
+            try:
+                return "json", _json_loads(content)
+            except json.JSONDecodeError:
+                # 可能是YAML的流式写法
+                candidate = "yaml"
             
-        # 尝试YAML
-        try:
-            yaml.safe_load(content)
-            # 检查是否是有效的YAML结构（不是纯字符串）
-            parsed = yaml.safe_load(content)
-            if isinstance(parsed, (dict, list)):
-                return "yaml"
-        except yaml.YAMLError:
-            pass
+        # 尝试YAML，检查是否是有效的YAML结构（不是纯字符串）
+        if candidate == "yaml":
+            yaml = _import_yaml()
+            try:
+                parsed = _yaml_load(content)
+                if isinstance(parsed, (dict, list)):
+                    return "yaml", parsed
+            except yaml.YAMLError:
+                pass
             
         # 默认为SSH Config格式
-        return "ssh"
+        return "ssh", None
     
     @staticmethod
     def ssh_to_dict(content: str) -> Dict[str, Any]:
         """将SSH Config格式转换为字典"""
+        # findall在C层一次扫描整段内容，直接返回 (关键字, 值) 元组，不创建Match对象；
+        # 空行、注释和没有值的行不会匹配
+        return SSHConfigConverter._tokens_to_dict(_LINE_RE.findall(content))
+    
+    @staticmethod
+    def ssh_bytes_to_dict(buffer: Union[bytes, mmap.mmap]) -> Dict[str, Any]:
+        """将字节形式（bytes或mmap）的SSH Config转换为字典，只解码保留下来的关键字和值"""
+        tokens = (
+            (raw_key.decode("utf-8"), value.decode("utf-8"))
+            for raw_key, value in _LINE_RE_BYTES.findall(buffer)
+        )
+        return SSHConfigConverter._tokens_to_dict(tokens)
+    
+    @staticmethod
+    def _tokens_to_dict(tokens: Iterable[Tuple[str, str]]) -> Dict[str, Any]:
+        """把 (关键字, 值) 序列组装成 {"hosts": [...]} 结构"""
         hosts: List[HostConfig] = []
         current_host: Optional[HostConfig] = None
-        lines = content.split('\n')
-        
-        # 多值选项列表
-        multi_value_keys = {'identityfile', 'localforward', 'remoteforward'}
         
-        for line in lines:
-            line = line.strip()
-            if not line or line.startswith('#'):
-                continue
-                
-            parts = line.split(maxsplit=1)
-            if len(parts) < 2:
-                continue
-                
-            key, value = parts[0].lower(), parts[1]
+        for raw_key, value in tokens:
+            key = raw_key.lower()
             
             if key == 'host':
                 if current_host is not None:
@@ -86,16 +328,13 @@ class SSHConfigConverter:
                         hosts.insert(0, {'Host': '*'})
                         current_host = hosts[0]
                 
+                # 使用标准大小写的键名（如IdentityFile），未知关键字保留原写法
+                canonical_key = _CANONICAL.get(key) or sys.intern(raw_key)
                 # 处理多值选项（如IdentityFile）
-                capitalized_key = key.capitalize()
-                if key in multi_value_keys:
-                    if capitalized_key not in current_host:
-                        current_host[capitalized_key] = []
-                    # 确保值是列表类型
-                    current_host[capitalized_key] = current_host[capitalized_key]  # type: ignore
-                    current_host[capitalized_key].append(value)  # type: ignore
+                if key in _MULTI_VALUE:
+                    current_host.setdefault(canonical_key, []).append(value)  # type: ignore
                 else:
-                    current_host[capitalized_key] = value
+                    current_host[canonical_key] = value
         
         if current_host is not None:
             hosts.append(current_host)
@@ -108,12 +347,14 @@ class SSHConfigConverter:
         if not isinstance(data, dict) or 'hosts' not in data:
             raise ValueError("Invalid data format for SSH conversion")
             
-        lines = []
+        # 直接写入StringIO，避免先构造行列表再join
+        buf = io.StringIO()
+        write = buf.write
         for host in data['hosts']:
             if not isinstance(host, dict) or 'Host' not in host:
                 continue
                 
-            lines.append(f"Host {host['Host']}")
+            write(f"Host {host['Host']}\n")
             
             for key, value in host.items():
                 if key == 'Host':
@@ -121,51 +362,114 @@ class SSHConfigConverter:
                     
                 if isinstance(value, list):
                     for item in value:
-                        lines.append(f"    {key} {item}")
+                        write(f"    {key} {item}\n")
                 else:
-                    lines.append(f"    {key} {value}")
-            lines.append("")  # 空行分隔
+                    write(f"    {key} {value}\n")
+            write("\n")  # 空行分隔
             
-        return '\n'.join(lines).rstrip()
+        return buf.getvalue().rstrip()
     
     @staticmethod
     def yaml_to_dict(content: str) -> Dict[str, Any]:
         """将YAML格式转换为字典"""
-        return yaml.safe_load(content)
+        return _yaml_load(content)
     
     @staticmethod
     def dict_to_yaml(data: Dict[str, Any]) -> str:
         """将字典转换为YAML格式"""
-        return yaml.dump(data, default_flow_style=False, allow_unicode=True)
+        text = SSHConfigConverter._fast_dict_to_yaml(data)
+        if text is not None:
+            return text
+        return _yaml_dump(data, default_flow_style=False, allow_unicode=True, sort_keys=False)
+    
+    @staticmethod
+    def _fast_dict_to_yaml(data: Dict[str, Any]) -> Optional[str]:
+        """直接拼接固定结构 {"hosts": [{键: 字符串或字符串列表}]} 的YAML，
+        结构不符或含有非ASCII/不可打印字符时返回None，由yaml.dump处理"""
+        if not isinstance(data, dict) or len(data) != 1 or not isinstance(data.get('hosts'), list):
+            return None
+        if not data['hosts']:
+            return "hosts: []\n"
+            
+        parts = ["hosts:\n"]
+        for host in data['hosts']:
+            if not isinstance(host, dict) or not host:
+                return None
+                
+            # 每个主机的第一个键跟在列表标记 "- " 后面
+            indent = "- "
+            for key, value in host.items():
+                key_text = _yaml_scalar(key)
+                if key_text is None:
+                    return None
+                    
+                if isinstance(value, list):
+                    if not value:
+                        return None
+                    parts.append(f"{indent}{key_text}:\n")
+                    for item in value:
+                        item_text = _yaml_scalar(item)
+                        if item_text is None:
+                            return None
+                        parts.append(f"  - {item_text}\n")
+                else:
+                    value_text = _yaml_scalar(value)
+                    if value_text is None:
+                        return None
+                    parts.append(f"{indent}{key_text}: {value_text}\n")
+                indent = "  "
+                
+        return "".join(parts)
     
     @staticmethod
     def json_to_dict(content: str) -> Dict[str, Any]:
         """将JSON格式转换为字典"""
-        return json.loads(content)
+        return _json_loads(content)
     
     @staticmethod
     def dict_to_json(data: Dict[str, Any]) -> str:
         """将字典转换为JSON格式"""
-        return json.dumps(data, indent=2, ensure_ascii=False)
+        return _json_dumps(data)
     
     def convert(self, input_content: str, target_format: str) -> str:
         """转换内容到指定格式"""
-        source_format = self.detect_format(input_content)
+        # 特征行能确定格式且已是目标格式时直接返回，省去完整解析和重新输出；
+        # 两种特征行都有或都没有时要靠完整检测确认。JSON的确认解析很便宜
+        # （且 "{" 开头也可能是YAML），仍走完整检测
+        if target_format != "json" and _sure_format(input_content.strip()) == target_format:
+            return input_content
+            
+        source_format, data = self._detect_and_parse(input_content)
         
         if source_format == target_format:
             return input_content
             
-        # 转换为中间字典格式
+        # 转换为中间字典格式（JSON/YAML在检测时已解析，直接复用）
         if source_format == "ssh":
             data = self.ssh_to_dict(input_content)
-        elif source_format == "yaml":
-            data = self.yaml_to_dict(input_content)
-        elif source_format == "json":
-            data = self.json_to_dict(input_content)
-        else:
-            raise ValueError(f"Unsupported source format: {source_format}")
         
-        # 转换为目标格式
+        return self._dict_to_format(data, target_format)
+    
+    def convert_file(self, path: Union[str, Path], target_format: str) -> str:
+        """转换文件内容到指定格式
+        
+        文件通过mmap映射，SSH Config按字节扫描，只解码保留下来的关键字和值，
+        不必先把整个文件解码成字符串；其他格式仍按 convert() 处理
+        """
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # 空文件无法映射，交给convert()报错
+                return self.convert("", target_format)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                # 只看文件开头：只有SSH特征行时按SSH格式处理
+                head = mm[:_SNIFF_SIZE].decode("utf-8", "ignore").lstrip()
+                if target_format != "ssh" and _sure_format(head) == "ssh":
+                    return self._dict_to_format(self.ssh_bytes_to_dict(mm), target_format)
+                content = mm[:].decode("utf-8")
+        return self.convert(content, target_format)
+    
+    def _dict_to_format(self, data: Dict[str, Any], target_format: str) -> str:
+        """把中间字典转换为目标格式"""
         if target_format == "ssh":
             return self.dict_to_ssh(data)
         elif target_format == "yaml":
@@ -18,13 +18,57 @@ This module provides functionality to parse and convert between SSH config,
 YAML, and JSON formats.
 """
 
+import hashlib
+import io
 import json
 import os
 import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, Iterator, List, Tuple, Union
 
-import yaml
+from .core import (
+    _SNIFF_SIZE,
+    _SSH_HINT_RE,
+    _import_yaml,
+    _json_dumps,
+    _json_loads,
+    _sniff_format,
+    _sure_format,
+    _yaml_dump,
+    _yaml_load,
+)
+
+
+# Classifies a whole SSH config line in one match: group 1 is the value of a
+# Host directive, groups 2/3 are any other "Keyword value" pair. Blank and
+# comment lines do not match at all.
+_LINE_RE = re.compile(
+    r'^[ \t]*(?:host[ \t]+(\S.*?)|([^\s#]\S*)[ \t]+(\S.*?))[ \t\r]*$',
+    re.IGNORECASE | re.MULTILINE,
+)
+
+# Files larger than this are not SSH client configs (e.g. big known_hosts)
+_MAX_CONFIG_SIZE = 1024 * 1024
+
+# Bump whenever parsing or the cache entry layout changes
+_CACHE_VERSION = 1
+
+# The cache keeps at most this many entries, dropping the least recently used
+_CACHE_MAX_ENTRIES = 256
+
+# Names of files process_directory never treats as configs (matched from the start)
+_SKIP_RE = re.compile(
+    r"""
+    .*\.pub$         # Public keys
+    | id_           # Private keys
+    | .*\.pem$       # PEM files
+    | known_hosts
+    | authorized_keys
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
 
 
 class SSHConfigParser:
@@ -36,36 +80,30 @@ class SSHConfigParser:
         hosts = []
         current_host = None
         
-        for line in content.splitlines():
-            line = line.strip()
-            if not line or line.startswith("#"):
-                continue
-                
-            # Handle Host directive
-            if line.lower().startswith("host "):
+        # findall() tokenizes the whole content in C and hands back plain
+        # (host_value, key, value) tuples; blank and comment lines never match
+        for host_value, key, value in _LINE_RE.findall(content):
+            # Handle Host directive (groups that did not take part are '')
+            if host_value:
                 if current_host:
                     hosts.append(current_host)
-                host_names = line[5:].strip().split()
+                host_names = host_value.split()
                 current_host = {"Host": host_names if len(host_names) > 1 else host_names[0]}
             elif current_host is not None:
-                # Handle key-value pairs
-                if " " in line:
-                    key, value = line.split(" ", 1)
-                    key = key.strip()
-                    value = value.strip()
-                    
-                    # Handle multi-value keys (like IdentityFile)
-                    if key in current_host:
-                        existing_value = current_host[key]
-                        if isinstance(existing_value, list):
-                            # Already a list, append the new value
-                            existing_value.append(value)
-                            current_host[key] = existing_value
-                        else:
-                            # Convert single value to list
-                            current_host[key] = [existing_value, value]
+                # Share one key object across all host dicts
+                key = sys.intern(key)
+                
+                # Handle multi-value keys (like IdentityFile)
+                existing_value = current_host.get(key)
+                if existing_value is not None:
+                    if isinstance(existing_value, list):
+                        # Already a list, append the new value
+                        existing_value.append(value)
                     else:
-                        current_host[key] = value
+                        # Convert single value to list
+                        current_host[key] = [existing_value, value]
+                else:
+                    current_host[key] = value
         
         if current_host:
             hosts.append(current_host)
@@ -75,14 +113,14 @@ class SSHConfigParser:
     @staticmethod
     def format_ssh_config(data: List[Dict[str, Any]]) -> str:
         """Format structured data back to SSH config format."""
-        lines = []
+        buf = io.StringIO()
+        write = buf.write
         
         for host in data:
             if isinstance(host.get("Host"), list):
-                host_line = "Host " + " ".join(host["Host"])
+                write("Host " + " ".join(host["Host"]) + "\n")
             else:
-                host_line = f"Host {host['Host']}"
-            lines.append(host_line)
+                write(f"Host {host['Host']}\n")
             
             for key, value in host.items():
                 if key == "Host":
@@ -90,12 +128,12 @@ class SSHConfigParser:
                     
                 if isinstance(value, list):
                     for item in value:
-                        lines.append(f"    {key} {item}")
+                        write(f"    {key} {item}\n")
                 else:
-                    lines.append(f"    {key} {value}")
-            lines.append("")  # Empty line between hosts
+                    write(f"    {key} {value}\n")
+            write("\n")  # Empty line between hosts
             
-        return "\n".join(lines).rstrip() + "\n"
+        return buf.getvalue().rstrip() + "\n"
 
 
 def detect_format(content: str) -> str:
@@ -104,83 +142,184 @@ def detect_format(content: str) -> str:
     Returns:
         str: One of 'ssh', 'yaml', 'json'
     """
+    return _detect_and_parse(content)[0]
+
+
+def _detect_and_parse(content: str) -> Tuple[str, Any]:
+    """Detect the format and keep whatever object was decoded along the way.
+    
+    Returns:
+        tuple: ``(format, data)`` where ``data`` is the parsed JSON/YAML
+        object, or ``None`` for SSH config content.
+    """
     content = content.strip()
     if not content:
-        return 'ssh'
+        return 'ssh', None
     
-    # Try JSON first
-    try:
-        json.loads(content)
-        return 'json'
-    except json.JSONDecodeError:
-        pass
+    # Guess from cheap textual hints, then confirm only that candidate
+    candidate = _sniff_format(content)
     
-    # Try YAML next
-    try:
-        yaml.safe_load(content)
-        # Additional check: if it looks like SSH config, prefer SSH
-        if _looks_like_ssh_config(content):
-            return 'ssh'
-        return 'yaml'
-    except yaml.YAMLError:
-        pass
+    if candidate == 'json':
+        try:
+            return 'json', _json_loads(content)
+        except json.JSONDecodeError:
+            # Could still be YAML flow style
+            candidate = 'yaml'
+    
+    if candidate == 'yaml':
+        yaml = _import_yaml()
+        try:
+            parsed = _yaml_load(content)
+            # A bare scalar is just SSH config lines folded into one string
+            if isinstance(parsed, (dict, list)):
+                return 'yaml', parsed
+        except yaml.YAMLError:
+            pass
     
     # Default to SSH config
-    return 'ssh'
+    return 'ssh', None
 
 
 def _looks_like_ssh_config(content: str) -> bool:
     """Check if content looks like SSH config format."""
-    lines = content.splitlines()
-    for line in lines[:10]:  # Check first 10 lines
-        line = line.strip()
-        if line and not line.startswith("#"):
-            if line.lower().startswith(("host ", "match ")):
-                return True
-            if " " in line and not line.startswith(("{", "[", "-")):
-                # Key-value pair without YAML/JSON syntax
-                return True
-    return False
-
-
-def convert_format(content: str, target_format: str, source_format: Union[str, None] = None) -> str:
+    return _SSH_HINT_RE.search(content) is not None
+
+
+def convert_format(
+    content: str,
+    target_format: str,
+    source_format: Union[str, None] = None,
+    *,
+    use_cache: bool = False,
+) -> str:
     """Convert content between formats.
     
     Args:
         content: Input content as string
         target_format: Target format ('ssh', 'yaml', 'json')
         source_format: Source format (auto-detected if None)
+        use_cache: Reuse parsed SSH/YAML data from the on-disk cache
+            (``$XDG_CACHE_HOME/ssh_config``) and store it there. Only
+            applies when the source format is auto-detected.
     
     Returns:
         Converted content as string
     """
-    if source_format is None:
-        source_format = detect_format(content)
+    # Nothing to parse or emit when the formats already match. Hints alone only
+    # settle the format when just one kind is present; JSON is always confirmed,
+    # since a leading "{" may turn out to be YAML flow style.
+    if source_format == target_format:
+        return content
+    if source_format is None and target_format != 'json' and _sure_format(content.strip()) == target_format:
+        return content
+    
+    data = None
+    from_cache = False
+    # A forced source_format may parse the content differently from detection,
+    # so only auto-detected results are cached
+    cache_path = _cache_path(content) if use_cache and source_format is None else None
+    cached = _load_cached(cache_path) if cache_path is not None else None
+    if cached is not None:
+        source_format, data = cached
+        from_cache = True
+    elif source_format is None:
+        source_format, data = _detect_and_parse(content)
     
     if source_format == target_format:
         return content
     
-    # Parse to intermediate format (list of dicts)
-    if source_format == 'ssh':
-        data = SSHConfigParser.parse_ssh_config(content)
-    elif source_format == 'yaml':
-        data = yaml.safe_load(content)
-    elif source_format == 'json':
-        data = json.loads(content)
-    else:
-        raise ValueError(f"Unsupported source format: {source_format}")
+    # Parse to intermediate format (list of dicts), unless detection already did
+    if data is None:
+        if source_format == 'ssh':
+            data = SSHConfigParser.parse_ssh_config(content)
+        elif source_format == 'yaml':
+            data = _yaml_load(content)
+        elif source_format == 'json':
+            data = _json_loads(content)
+        else:
+            raise ValueError(f"Unsupported source format: {source_format}")
+    
+    # JSON input already parses as fast as the cache would
+    if cache_path is not None and not from_cache and source_format != 'json':
+        _store_cached(cache_path, source_format, data)
     
     # Convert to target format
     if target_format == 'ssh':
         return SSHConfigParser.format_ssh_config(data)
     elif target_format == 'yaml':
-        return yaml.dump(data, default_flow_style=False, indent=2)
+        return _yaml_dump(data, default_flow_style=False, indent=2)
     elif target_format == 'json':
-        return json.dumps(data, indent=2)
+        return _json_dumps(data)
     else:
         raise ValueError(f"Unsupported target format: {target_format}")
 
 
+def _cache_path(content: str) -> Path:
+    """Return the cache file for ``content``, keyed by its SHA-1 digest.
+    
+    The digest also covers ``_CACHE_VERSION``, so bumping it invalidates
+    every existing entry.
+    """
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    digest = hashlib.sha1(f'{_CACHE_VERSION}\0{content}'.encode('utf-8', 'surrogatepass')).hexdigest()
+    return Path(cache_home) / 'ssh_config' / f'{digest}.json'
+
+
+def _load_cached(path: Path) -> Union[Tuple[str, Any], None]:
+    """Load ``(source_format, data)`` from a cache file, or None if unavailable."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            entry = _json_loads(f.read())
+        result = entry['format'], entry['data']
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    # Mark the entry as recently used so pruning keeps it
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return result
+
+
+def _store_cached(path: Path, source_format: str, data: Any) -> None:
+    """Store parsed data in the cache; failures are silently ignored."""
+    entry = {'format': source_format, 'data': data}
+    try:
+        text = json.dumps(entry)
+        # Only cache data that survives a JSON round trip (no dates, int keys...)
+        if json.loads(text) != entry:
+            return
+        # Cached configs may hold host names, users and key paths: keep them
+        # readable by the owner only
+        path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        except OSError:
+            os.unlink(tmp_path)
+            raise
+    except (OSError, TypeError, ValueError):
+        return
+    _prune_cache(path.parent)
+
+
+def _prune_cache(cache_dir: Path) -> None:
+    """Delete the least recently used entries beyond ``_CACHE_MAX_ENTRIES``."""
+    try:
+        with os.scandir(cache_dir) as it:
+            entries = [entry for entry in it if entry.is_file(follow_symlinks=False)]
+        if len(entries) <= _CACHE_MAX_ENTRIES:
+            return
+        entries.sort(key=lambda entry: entry.stat(follow_symlinks=False).st_mtime)
+        for entry in entries[:len(entries) - _CACHE_MAX_ENTRIES]:
+            os.unlink(entry.path)
+    except OSError:
+        pass
+
+
 def process_directory(directory: Union[str, Path]) -> List[Dict[str, Any]]:
     """Process all SSH config files in a directory.
     
@@ -191,31 +330,63 @@ def process_directory(directory: Union[str, Path]) -> List[Dict[str, Any]]:
         raise FileNotFoundError(f"Directory not found: {directory}")
     
     config_files = []
-    skip_patterns = [
-        r'.*\.pub$',  # Public keys
-        r'id_.*',     # Private keys
-        r'.*\.pem$',  # PEM files
-        r'known_hosts',
-        r'authorized_keys',
-    ]
-    
-    for file_path in directory.rglob('*'):
-        if file_path.is_file():
-            # Skip non-config files
-            should_skip = False
-            for pattern in skip_patterns:
-                if re.match(pattern, file_path.name, re.IGNORECASE):
-                    should_skip = True
-                    break
-            
-            if not should_skip:
-                try:
-                    with open(file_path, 'r') as f:
-                        content = f.read()
-                        if detect_format(content) == 'ssh':
-                            config_files.extend(SSHConfigParser.parse_ssh_config(content))
-                except (UnicodeDecodeError, OSError):
-                    # Skip binary files or unreadable files
-                    continue
     
-    return config_files
\ No newline at end of file
+    # Skip non-config files
+    candidates = [entry for entry in _scan_files(directory) if not _SKIP_RE.match(entry.name)]
+    
+    # File reads release the GIL, so read and parse the candidates concurrently;
+    # map() keeps the results in scan order
+    if candidates:
+        max_workers = min(32, (os.cpu_count() or 1) * 4, len(candidates))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for hosts in executor.map(_parse_config_file, candidates):
+                config_files.extend(hosts)
+    
+    return config_files
+
+
+def _parse_config_file(entry: os.DirEntry) -> List[Dict[str, Any]]:
+    """Read a single file and parse it if it is an SSH config.
+    
+    Returns an empty list for files that are not SSH configs or cannot be read.
+    """
+    try:
+        # Skip empty files and anything too large to be a config;
+        # DirEntry caches the stat result
+        size = entry.stat().st_size
+        if size == 0 or size > _MAX_CONFIG_SIZE:
+            return []
+        with open(entry.path, 'r', buffering=65536) as f:
+            # Guess from the header only: confirming it with a full JSON/YAML
+            # parse would fail on a truncated file and fall back to SSH
+            content = f.read(_SNIFF_SIZE)
+            if _sniff_format(content.lstrip()) != 'ssh':
+                return []
+            content += f.read()
+    except (UnicodeDecodeError, OSError):
+        # Skip binary files or unreadable files
+        return []
+    return SSHConfigParser.parse_ssh_config(content)
+
+
+def _scan_files(directory: Union[str, Path]) -> Iterator[os.DirEntry]:
+    """Recursively yield regular files below ``directory``.
+    
+    Uses ``os.scandir`` so file type and stat information come from the
+    directory listing instead of a separate ``stat`` per path. Symlinked
+    directories are not followed; unreadable directories are skipped.
+    """
+    try:
+        with os.scandir(directory) as it:
+            entries = list(it)
+    except OSError:
+        return
+    
+    for entry in entries:
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _scan_files(entry.path)
+            elif entry.is_file():
+                yield entry
+        except OSError:
+            continue
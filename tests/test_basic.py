@@ -1,9 +1,16 @@
+import json
 import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
+from pathlib import Path
+
 import pytest
+import yaml
+from typer.testing import CliRunner
+from ssh_config import app
 from ssh_config.core import SSHConfigConverter, convert_ssh_config
+from ssh_config.parser import convert_format, detect_format, process_directory
 
 
 def test_ssh_to_yaml():
@@ -56,8 +63,325 @@ def test_convert_function():
     assert '"Host": "test"' in json_result
 
 
+def test_detect_format():
+    """测试格式自动检测"""
+    assert SSHConfigConverter.detect_format("Host a\n    User b\n") == "ssh"
+    assert SSHConfigConverter.detect_format("User b\nPort 22\n") == "ssh"
+    assert SSHConfigConverter.detect_format('{"hosts": []}') == "json"
+    assert SSHConfigConverter.detect_format("# 注释\nhosts:\n- Host: a\n") == "yaml"
+    assert SSHConfigConverter.detect_format("{hosts: []}") == "yaml"
+    
+    # YAML块标量里缩进的include/Host不能当成SSH特征
+    yaml_content = "hosts:\n- Host: db\n  RemoteCommand: >\n    include /etc/motd\n"
+    assert SSHConfigConverter.detect_format(yaml_content) == "yaml"
+    assert detect_format(yaml_content) == "yaml"
+    assert detect_format("description: |\n  Host forwarding\n") == "yaml"
+
+
+def test_convert_same_format_shortcut():
+    """测试只有特征行能确定格式时才原样返回，否则完整检测后再转换"""
+    converter = SSHConfigConverter()
+    ssh_content = "Host a\n    User b\n"
+    yaml_content = "hosts:\n- Host: a\n  User: b\n"
+    # 只有一种特征行：已是目标格式，原样返回
+    assert converter.convert(ssh_content, "ssh") is ssh_content
+    assert converter.convert(yaml_content, "yaml") is yaml_content
+    assert convert_format(ssh_content, "ssh") is ssh_content
+    assert convert_format(yaml_content, "yaml") is yaml_content
+    
+    # 只有YAML特征行，缩进的include不是SSH特征：按YAML解析后转换
+    folded = "hosts:\n- Host: db\n  RemoteCommand: >\n    include /etc/motd\n"
+    assert converter.convert(folded, "ssh") == "Host db\n    RemoteCommand include /etc/motd"
+    
+    # 两种特征行都有：YAML确认失败（只得到字符串），按SSH解析后转换
+    mixed = "---\nUser bob\nPort 22\n"
+    result = converter.convert(mixed, "yaml")
+    assert result != mixed
+    assert yaml.safe_load(result)["hosts"][0] == {"Host": "*", "User": "bob", "Port": "22"}
+    mixed = "---\nHost a\nUser bob\n"
+    assert yaml.safe_load(convert_format(mixed, "yaml")) == [{"Host": "a", "User": "bob"}]
+
+def test_ssh_keyword_case():
+    """测试SSH关键字按标准大小写输出，多值选项保存为列表"""
+    ssh_content = """Host test
+    hostname test.com
+    IDENTITYFILE ~/.ssh/a
+    identityfile ~/.ssh/b
+    CustomOption yes
+"""
+    
+    data = SSHConfigConverter.ssh_to_dict(ssh_content)
+    assert data["hosts"] == [{
+        "Host": "test",
+        "HostName": "test.com",
+        "IdentityFile": ["~/.ssh/a", "~/.ssh/b"],
+        "CustomOption": "yes",
+    }]
+
+
+def test_dict_to_yaml_round_trip():
+    """测试快速YAML输出可以被正确解析回原数据"""
+    data = {"hosts": [{
+        "Host": "example.com",
+        "Port": "2222",
+        "User": "yes",
+        "IdentityFile": ["~/.ssh/id_ed25519", "~/.ssh/it's"],
+        "ProxyCommand": "ssh -W %h:%p bastion",
+        "LocalCommand": "echo a # b",
+        "ControlPath": "",
+    }]}
+    
+    yaml_content = SSHConfigConverter.dict_to_yaml(data)
+    assert yaml_content.startswith("hosts:\n- Host: example.com\n")
+    assert yaml.safe_load(yaml_content) == data
+    
+    # 非ASCII内容交给yaml.dump处理
+    data = {"hosts": [{"Host": "服务器"}]}
+    assert yaml.safe_load(SSHConfigConverter.dict_to_yaml(data)) == data
+
+
+def test_convert_file(tmp_path):
+    """测试通过mmap转换文件"""
+    ssh_file = tmp_path / "config"
+    ssh_file.write_bytes("# 注释\nHost test\n    HostName test.com\r\n    User 用户\n".encode("utf-8"))
+    
+    converter = SSHConfigConverter()
+    json_result = converter.convert_file(ssh_file, "json")
+    assert json_result == converter.convert(ssh_file.read_text(encoding="utf-8"), "json")
+    assert '"User": "用户"' in json_result
+    
+    # 非ASCII空白不是分隔符，字符串和mmap两种解析结果一致
+    for space in ("\u00a0", "\u3000", "\x1c"):
+        ssh_file.write_bytes(f"Host h\n    User{space}x bob\n    Port 22{space}\n".encode("utf-8"))
+        json_result = converter.convert_file(ssh_file, "json")
+        assert json_result == converter.convert(ssh_file.read_text(encoding="utf-8"), "json")
+        assert json.loads(json_result)["hosts"][0] == {"Host": "h", f"User{space}x": "bob", "Port": f"22{space}"}
+    
+    yaml_file = tmp_path / "config.yaml"
+    yaml_file.write_text("hosts:\n- Host: test\n", encoding="utf-8")
+    assert converter.convert_file(yaml_file, "ssh") == "Host test"
+
+
+def test_json_helpers_match_stdlib():
+    """测试JSON输出与标准库一致（无论是否安装orjson），包括非ASCII和超过64位的整数"""
+    from ssh_config.core import _json_dumps, _json_loads
+    
+    for data in (
+        [{"Host": "a", "User": "\u00fc", "Big": 2 ** 70, "Port": 22}],
+        {"hosts": [], "empty": {}, "neg": -2 ** 63 - 1, "on": True, "none": None},
+        {"floats": [1e16, 0.1, float("inf"), float("-inf")], 1: "int key"},
+    ):
+        text = _json_dumps(data)
+        assert text == json.dumps(data, indent=2, ensure_ascii=False)
+        assert _json_loads(text) == json.loads(text)
+    
+    for text in ("[-9999999999999999999]", "[18446744073709551616]", "[NaN, 1e400]"):
+        assert repr(_json_loads(text)) == repr(json.loads(text))
+    
+    # YAML中的日期等类型标准库无法序列化，安装orjson时也一样报错
+    date_data = yaml.safe_load("day: 2024-01-01\n")
+    with pytest.raises(TypeError):
+        json.dumps(date_data)
+    with pytest.raises(TypeError):
+        _json_dumps(date_data)
+    
+    # 共享（YAML别名）的容器照常输出
+    shared = yaml.safe_load("a: &x [1]\nb: *x\n")
+    assert _json_dumps(shared) == json.dumps(shared, indent=2, ensure_ascii=False)
+    assert '"User": "\u00fc"' in convert_format("Host a\n    User \u00fc\n", "json")
+
+
+def test_parse_ssh_config():
+    """测试SSHConfigParser.parse_ssh_config的逐行解析"""
+    from ssh_config.parser import SSHConfigParser
+    
+    content = (
+        "# 注释\r\n"
+        "\r\n"
+        "  HOST a b\r\n"
+        "HostName\texample.com\r\n"
+        "\tUser bob  \r\n"
+        "    # 缩进的注释\n"
+        "\n"
+        "host c\n"
+        "  identityfile ~/.ssh/1\n"
+        "  identityfile ~/.ssh/2\n"
+        "Host\n"
+        "Port 22\n"
+    )
+    # 制表符分隔、缩进和大写的Host、多个主机名、CRLF换行都能解析；
+    # 注释和空行被忽略，没有值的Host行被跳过，后面的选项仍属于上一个主机
+    assert SSHConfigParser.parse_ssh_config(content) == [
+        {"Host": ["a", "b"], "HostName": "example.com", "User": "bob"},
+        {"Host": "c", "identityfile": ["~/.ssh/1", "~/.ssh/2"], "Port": "22"},
+    ]
+    assert SSHConfigParser.parse_ssh_config("# 只有注释\n\n") == []
+
+def test_ssh_keyword_trie_pattern():
+    """测试由关键字列表生成的前缀树正则"""
+    import re
+    from ssh_config.core import _SSH_KEYWORDS, _trie_pattern
+    from ssh_config.parser import _looks_like_ssh_config
+    
+    pattern = re.compile(_trie_pattern(_SSH_KEYWORDS), re.IGNORECASE)
+    for keyword in _SSH_KEYWORDS:
+        assert pattern.fullmatch(keyword), keyword
+        assert pattern.fullmatch(keyword.upper()), keyword
+    for near_miss in ["Hosts", "IdentityFiles", "Hos", "Portt", "Use", ""]:
+        assert not pattern.fullmatch(near_miss), near_miss
+    assert _trie_pattern(["host", "hostname", "hostkeyalias", "a", "ab"]) == "(?:ab?|host(?:keyalias|name)?)"
+    
+    assert _looks_like_ssh_config("Port=22\n")
+    assert _looks_like_ssh_config("User foo\n")
+    assert not _looks_like_ssh_config("  Host example.com\n")
+    assert not _looks_like_ssh_config("description: |\n  Host forwarding\n")
+    assert not _looks_like_ssh_config("Hosts foo\n")
+    assert not _looks_like_ssh_config("description: |\n  Port forwarding\n")
+    assert not _looks_like_ssh_config("Port: 22\n")
+
+
+def test_process_directory(tmp_path, monkeypatch):
+    """测试目录扫描：跳过密钥、空文件、过大文件和非SSH格式文件，不跟随目录符号链接"""
+    from ssh_config.parser import SSHConfigParser, _scan_files
+    
+    parsed = []
+    parse_ssh_config = SSHConfigParser.parse_ssh_config
+    def record_parse(content):
+        parsed.append(content)
+        return parse_ssh_config(content)
+    monkeypatch.setattr(SSHConfigParser, "parse_ssh_config", staticmethod(record_parse))
+    
+    ssh_dir = tmp_path / ".ssh"
+    (ssh_dir / "config.d" / "nested").mkdir(parents=True)
+    (ssh_dir / "config").write_text("Host main\n    User a\n", encoding="utf-8")
+    (ssh_dir / "config.d" / "nested" / "work").write_text("Host nested\n    User b\n", encoding="utf-8")
+    for i in range(20):
+        (ssh_dir / "config.d" / f"host{i:02d}").write_text(f"Host h{i}\n    Port {i}\n", encoding="utf-8")
+    
+    # 这些文件都不应被解析
+    (ssh_dir / "id_ed25519").write_text("Host key\n", encoding="utf-8")
+    (ssh_dir / "id_ed25519.pub").write_text("Host pub\n", encoding="utf-8")
+    (ssh_dir / "empty").write_text("", encoding="utf-8")
+    (ssh_dir / "huge").write_text("Host huge\n" + "#" * (1024 * 1024) + "\n", encoding="utf-8")
+    (ssh_dir / "hosts.yaml").write_text("hosts:\n- Host: yaml\n", encoding="utf-8")
+    # 超过探测长度的JSON文件，开头截断后无法确认解析，也不能当成SSH
+    big_json = json.dumps([{"Host": f"json{i}", "User": "u"} for i in range(200)], indent=2)
+    assert len(big_json) > 4096
+    (ssh_dir / "hosts.json").write_text(big_json, encoding="utf-8")
+    
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    (outside / "config").write_text("Host outside\n", encoding="utf-8")
+    (ssh_dir / "linked").symlink_to(outside, target_is_directory=True)
+    
+    hosts = [host["Host"] for host in process_directory(ssh_dir)]
+    assert sorted(hosts) == sorted(["main", "nested"] + [f"h{i}" for i in range(20)])
+    assert len(parsed) == 22
+    
+    # 结果顺序与扫描顺序一致
+    scanned = [Path(entry.path).name for entry in _scan_files(ssh_dir)]
+    names = {"config": "main", "work": "nested", **{f"host{i:02d}": f"h{i}" for i in range(20)}}
+    assert hosts == [names[name] for name in scanned if name in names]
+
+
+def test_convert_format_cache(tmp_path, monkeypatch):
+    """测试convert_format的磁盘缓存"""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    cache_dir = tmp_path / "ssh_config"
+    yaml_content = """- Host: example.com
+  HostName: example.com
+"""
+    
+    # 默认不使用缓存
+    first = convert_format(yaml_content, "ssh")
+    assert "Host example.com" in first
+    assert not cache_dir.exists()
+    
+    assert convert_format(yaml_content, "ssh", use_cache=True) == first
+    cache_files = list(cache_dir.glob("*.json"))
+    assert len(cache_files) == 1
+    
+    # 改写缓存内容，证明第二次转换读取的是缓存
+    entry = json.loads(cache_files[0].read_text(encoding="utf-8"))
+    entry["data"] = [{"Host": "cached.example.com"}]
+    cache_files[0].write_text(json.dumps(entry), encoding="utf-8")
+    assert convert_format(yaml_content, "ssh", use_cache=True) == "Host cached.example.com\n"
+    
+    # use_cache只能作为关键字参数传入
+    with pytest.raises(TypeError):
+        convert_format(yaml_content, "ssh", None, True)
+
+
+def test_convert_format_cache_forced_source(tmp_path, monkeypatch):
+    """测试强制指定source_format的结果不会写入缓存"""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    ssh_content = "Host a\n    User b\n"
+    
+    assert convert_format(ssh_content, "json", source_format="yaml", use_cache=True) == '"Host a User b"'
+    assert not (tmp_path / "ssh_config").exists()
+    
+    expected = convert_format(ssh_content, "json")
+    assert json.loads(expected) == [{"Host": "a", "User": "b"}]
+    assert convert_format(ssh_content, "json", use_cache=True) == expected
+    assert convert_format(ssh_content, "json", use_cache=True) == expected
+
+
+def test_convert_format_cache_files(tmp_path, monkeypatch):
+    """测试缓存目录和文件只有所有者可读写，条目数超过上限时删除最久未用的"""
+    import stat
+    from ssh_config import parser
+    
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.setattr(parser, "_CACHE_MAX_ENTRIES", 2)
+    cache_dir = tmp_path / "ssh_config"
+    
+    contents = [f"Host h{i}\n    User u\n" for i in range(3)]
+    for i, content in enumerate(contents):
+        convert_format(content, "json", use_cache=True)
+        path = parser._cache_path(content)
+        assert path.exists()
+        # 把修改时间改回很早以前，保证淘汰顺序不受文件系统时间精度影响
+        os.utime(path, (1000 + i, 1000 + i))
+        if i == 1:
+            # 命中缓存会刷新修改时间，h0因此比h1更晚被淘汰
+            convert_format(contents[0], "json", use_cache=True)
+    
+    assert stat.S_IMODE(cache_dir.stat().st_mode) == 0o700
+    remaining = sorted(cache_dir.iterdir())
+    assert remaining == sorted([parser._cache_path(contents[0]), parser._cache_path(contents[2])])
+    for path in remaining:
+        assert stat.S_IMODE(path.stat().st_mode) == 0o600
+
+
+def test_cli_convert(tmp_path, monkeypatch):
+    """测试包内convert命令读取输入文件并按输出文件扩展名写出结果"""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    src = tmp_path / "config"
+    src.write_text("Host a\n    User b\n", encoding="utf-8")
+    out = tmp_path / "config.yaml"
+    
+    result = CliRunner().invoke(app, ["convert", str(src), str(out)])
+    assert result.exit_code == 0, result.output
+    assert yaml.safe_load(out.read_text(encoding="utf-8")) == [{"Host": "a", "User": "b"}]
+    
+    # --to优先于扩展名
+    out_json = tmp_path / "config.yaml.out"
+    result = CliRunner().invoke(app, ["convert", str(src), str(out_json), "--to", "json"])
+    assert result.exit_code == 0, result.output
+    assert json.loads(out_json.read_text(encoding="utf-8")) == [{"Host": "a", "User": "b"}]
+    
+    result = CliRunner().invoke(app, ["convert", str(tmp_path / "missing"), str(out)])
+    assert result.exit_code == 1
+
+
 if __name__ == "__main__":
     test_ssh_to_yaml()
     test_yaml_to_ssh()
     test_convert_function()
+    test_detect_format()
+    test_convert_same_format_shortcut()
+    test_ssh_keyword_case()
+    test_dict_to_yaml_round_trip()
+    test_parse_ssh_config()
+    test_ssh_keyword_trie_pattern()
     print("All tests passed!")
\ No newline at end of file